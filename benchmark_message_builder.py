@@ -0,0 +1,47 @@
+# benchmark_message_builder.py
+
+import sys
+import os
+import timeit
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+
+# Add the source directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), 'src')))
+
+from infrastructure.email_sender import MessageBuilder
+
+SENDER = 'sender@example.com'
+RECIPIENT = 'alice@example.com'
+SUBJECT = 'Anonymous Message'
+BODY_SIZES = [100, 1_000, 10_000, 100_000, 1_000_000]
+
+def build_with_email_package(content: str) -> bytes:
+    """The previous approach: a multipart message rendered by the email generator."""
+    msg = MIMEMultipart()
+    msg['From'] = SENDER
+    msg['To'] = RECIPIENT
+    msg['Subject'] = SUBJECT
+    msg.attach(MIMEText(content, 'plain'))
+    return msg.as_string().encode('ascii')
+
+def make_body(size: int, non_ascii: bool) -> str:
+    line = ('Grüße aus der Ferne. ' if non_ascii else 'Hello from far away. ') * 3 + '\n'
+    return (line * (size // len(line) + 1))[:size]
+
+def time_call(func, number: int) -> float:
+    """Returns the best per-call time in microseconds."""
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+if __name__ == "__main__":
+    builder = MessageBuilder(SENDER)
+    print(f"{'body':>10} {'charset':>8} {'email pkg (us)':>15} {'builder (us)':>13} {'8bitmime (us)':>14}")
+    for size in BODY_SIZES:
+        number = max(1, 200_000 // size)
+        for non_ascii in (False, True):
+            content = make_body(size, non_ascii)
+            legacy = time_call(lambda: build_with_email_package(content), number)
+            fast = time_call(lambda: builder.build(RECIPIENT, SUBJECT, content), number)
+            eightbit = time_call(lambda: builder.build(RECIPIENT, SUBJECT, content, eightbitmime=True), number)
+            charset = 'utf-8' if non_ascii else 'ascii'
+            print(f"{size:>10} {charset:>8} {legacy:>15.1f} {fast:>13.1f} {eightbit:>14.1f}")
@@ -0,0 +1,117 @@
+# application/domain_scheduler.py
+
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional, Tuple
+from infrastructure.logger import logger
+
+class TokenBucket:
+    """
+    A token bucket that refills at a fixed rate up to a maximum burst size.
+    It uses wall-clock time so its state stays valid when saved between job runs.
+    """
+    def __init__(self, rate_per_second: float, burst: int,
+                 tokens: Optional[float] = None, last_refill: Optional[float] = None):
+        self.rate_per_second = rate_per_second
+        self.capacity = float(burst)
+        self.tokens = self.capacity if tokens is None else min(self.capacity, float(tokens))
+        self.last_refill = time.time() if last_refill is None else float(last_refill)
+
+    def _refill(self) -> None:
+        now = time.time()
+        if now < self.last_refill:
+            # The clock moved backwards; restart the refill from now.
+            self.last_refill = now
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate_per_second)
+        self.last_refill = now
+
+    def try_consume(self) -> bool:
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def time_until_available(self) -> float:
+        self._refill()
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate_per_second
+
+    def is_full(self) -> bool:
+        self._refill()
+        return self.tokens >= self.capacity
+
+    def to_state(self) -> dict:
+        return {'tokens': self.tokens, 'last_refill': self.last_refill}
+
+class DomainScheduler:
+    """
+    Schedules pending emails fairly across recipient domains.
+    Email ids are indexed in memory by recipient domain once, then handed out round-robin
+    so a burst to one domain cannot starve the others, while a per-domain
+    token bucket keeps each provider under its rate limit. Bucket state can be
+    saved and restored so the limit holds across job runs.
+    """
+    def __init__(self, pending: List[Tuple[int, str]], rate_per_second: float, burst: int,
+                 bucket_state: Optional[Dict[str, dict]] = None):
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self.queues: "OrderedDict[str, Deque[int]]" = OrderedDict()
+        self.buckets: Dict[str, TokenBucket] = {}
+        for domain, state in (bucket_state or {}).items():
+            self.buckets[domain] = TokenBucket(rate_per_second, burst,
+                                               tokens=state.get('tokens'), last_refill=state.get('last_refill'))
+        for email_id, recipient in pending:
+            self.add(email_id, recipient)
+
+    @staticmethod
+    def _domain_of(recipient) -> Optional[str]:
+        # Rows read from the queue may hold NaN or other non-string recipients.
+        if not isinstance(recipient, str) or '@' not in recipient:
+            return None
+        domain = recipient.rsplit('@', 1)[-1].strip().lower()
+        return domain or None
+
+    def add(self, email_id: int, recipient: str) -> None:
+        """Adds an email id to its recipient domain's queue, skipping malformed recipients."""
+        domain = self._domain_of(recipient)
+        if domain is None:
+            logger.error(f"Email with ID {email_id} has an invalid recipient. It will remain in the queue.")
+            return
+        if domain not in self.queues:
+            self.queues[domain] = deque()
+            self.buckets.setdefault(domain, TokenBucket(self.rate_per_second, self.burst))
+        self.queues[domain].append(email_id)
+
+    def pending(self) -> int:
+        return sum(len(queue) for queue in self.queues.values())
+
+    def next_email_id(self) -> Optional[int]:
+        """
+        Returns the next email id from the first domain in round-robin order that
+        has a token available, or None if every pending domain is throttled.
+        """
+        for _ in range(len(self.queues)):
+            domain, queue = next(iter(self.queues.items()))
+            # Rotate this domain to the back so the next call starts with another one.
+            self.queues.move_to_end(domain)
+            if self.buckets[domain].try_consume():
+                email_id = queue.popleft()
+                if not queue:
+                    del self.queues[domain]
+                return email_id
+        return None
+
+    def time_until_next(self) -> float:
+        """Returns the seconds until any pending domain has a token available."""
+        if not self.queues:
+            return 0.0
+        return min(self.buckets[domain].time_until_available() for domain in self.queues)
+
+    def bucket_state(self) -> Dict[str, dict]:
+        """
+        Returns the state of every bucket that is not yet full, for saving
+        between runs. Full buckets are dropped since they restore as new ones.
+        """
+        return {domain: bucket.to_state() for domain, bucket in self.buckets.items() if not bucket.is_full()}
@@ -1,36 +1,64 @@
 # application/email_service.py
 
+from typing import Optional
 from domain.email_repository import EmailRepository
 from domain.models import EmailMessage
 from infrastructure.ai_service import AIService
+from infrastructure.idempotency_index import IdempotencyIndex, IdempotencyConflictError
 from infrastructure.logger import logger
 
+class AbusiveContentError(Exception):
+    """Raised when AI moderation rejects the content of an email."""
+    pass
+
 class EmailService:
     """
     Application service for handling email-related use cases.
     It combines AI moderation, encryption, and queuing logic.
     """
-    def __init__(self, email_repository: EmailRepository, ai_service: AIService):
+    def __init__(self, email_repository: EmailRepository, ai_service: AIService,
+                 idempotency_index: Optional[IdempotencyIndex] = None):
         self.email_repository = email_repository
         self.ai_service = ai_service
+        self.idempotency_index = idempotency_index
 
-    def queue_email_for_sending(self, recipient: str, subject: str, content: str) -> bool:
+    def queue_email_for_sending(self, recipient: str, subject: str, content: str,
+                                idempotency_key: Optional[str] = None) -> Optional[int]:
         """
         Validates email content with AI and queues the email for asynchronous sending.
+        A repeated request within the idempotency window is not moderated or queued
+        again; if it arrives while the first is still in progress, it waits for it.
         
         Args:
             recipient (str): The email recipient.
             subject (str): The email subject.
             content (str): The email content.
+            idempotency_key (str): Optional client-supplied key identifying the request.
             
         Returns:
-            bool: True if the email was successfully queued, False otherwise.
+            Optional[int]: The ID of the queued (or previously queued) email, or None on failure.
+
+        Raises:
+            AbusiveContentError: If the content is flagged by AI moderation.
+            IdempotencyConflictError: If the idempotency key was used for a different message.
         """
+        # Only set once this request holds the reservation, so only its owner releases it
+        key = None
         try:
+            # Step 0: Reserve the request, or return the original message for a duplicate
+            if self.idempotency_index is not None:
+                request_key = self.idempotency_index.make_key(recipient, subject, content, idempotency_key)
+                fingerprint = self.idempotency_index.make_fingerprint(recipient, subject, content)
+                existing_id = self.idempotency_index.claim(request_key, fingerprint)
+                if existing_id is not None:
+                    logger.info(f"Duplicate request for email with ID {existing_id}. Not queuing again.")
+                    return existing_id
+                key = request_key
+
             # Step 1: Check for abusive content using the AI service
             if self.ai_service.check_for_abuse(content):
                 logger.warning("Email content flagged as abusive. Not queuing.")
-                return False
+                raise AbusiveContentError("Email content flagged as abusive.")
 
             # Step 2: Create a domain model instance
             email = EmailMessage(
@@ -41,9 +69,19 @@ class EmailService:
 
             # Step 3: Add the email to the repository
             self.email_repository.add_email(email)
+            email_id = int(email.id)
+            if key is not None:
+                self.idempotency_index.put(key, email_id)
+                key = None
             logger.info("Email successfully queued for sending.")
-            return True
+            return email_id
 
+        except (AbusiveContentError, IdempotencyConflictError):
+            raise
         except Exception as e:
             logger.error(f"An error occurred while queuing the email: {e}")
-            return False
+            return None
+        finally:
+            # A reservation still held here means the request failed; let duplicates retry.
+            if key is not None:
+                self.idempotency_index.release(key)
@@ -2,7 +2,7 @@
 
 from abc import ABC, abstractmethod
 from typing import List, Optional
-from domain.models import EmailMessage
+from domain.models import EmailMessage, PendingEmail
 
 # Abstract base class for the email message repository.
 # Defines the contract for storing and retrieving email data.
@@ -17,6 +17,16 @@ class EmailRepository(ABC):
         """Retrieves a limited number of unsent emails."""
         pass
 
+    @abstractmethod
+    def get_pending_emails(self) -> List[PendingEmail]:
+        """Retrieves every unsent email in one read, without decrypting content."""
+        pass
+
+    @abstractmethod
+    def decrypt_content(self, encrypted_content: str) -> str:
+        """Decrypts the stored content of a pending email."""
+        pass
+
     @abstractmethod
     def update_email_status(self, email_id: int, is_sent: bool) -> None:
         """Updates the sent status of an email message."""
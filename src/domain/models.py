@@ -11,3 +11,11 @@ class EmailMessage:
     id: int = 0
     is_sent: bool = False
     sent_timestamp: datetime = None
+
+@dataclass
+class PendingEmail:
+    """An unsent email as stored in the queue, with its content still encrypted."""
+    id: int
+    recipient: str
+    subject: str
+    encrypted_content: str
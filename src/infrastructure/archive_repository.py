@@ -0,0 +1,137 @@
+# infrastructure/archive_repository.py
+
+import os
+import glob
+import pandas as pd
+from datetime import datetime
+from typing import List
+from infrastructure.logger import logger
+
+class CSVArchiveRepository:
+    """
+    Stores compacted email rows in monthly, gzip-compressed CSV segments.
+    Each segment is named after the month of its rows' sent_timestamp,
+    so time-range queries only open the segments that overlap the range.
+    """
+    SEGMENT_PREFIX = 'emails_'
+    SEGMENT_SUFFIX = '.csv.gz'
+
+    def __init__(self, archive_dir: str):
+        self.archive_dir = archive_dir
+        os.makedirs(self.archive_dir, exist_ok=True)
+
+    def _segment_path(self, month: str) -> str:
+        return os.path.join(self.archive_dir, f"{self.SEGMENT_PREFIX}{month}{self.SEGMENT_SUFFIX}")
+
+    def _segment_month(self, path: str) -> str:
+        name = os.path.basename(path)
+        return name[len(self.SEGMENT_PREFIX):-len(self.SEGMENT_SUFFIX)]
+
+    def _list_segments(self) -> List[str]:
+        pattern = os.path.join(self.archive_dir, f"{self.SEGMENT_PREFIX}*{self.SEGMENT_SUFFIX}")
+        return sorted(glob.glob(pattern))
+
+    def _read_segment(self, path: str) -> pd.DataFrame:
+        df = pd.read_csv(path, compression='gzip')
+        df['sent_timestamp'] = pd.to_datetime(df['sent_timestamp'], errors='coerce', format='ISO8601')
+        return df
+
+    def _write_segment(self, path: str, df: pd.DataFrame) -> None:
+        # Write to a temporary file first so a crash never leaves a truncated segment.
+        tmp_path = f"{path}.tmp"
+        df.to_csv(tmp_path, index=False, compression='gzip')
+        os.replace(tmp_path, path)
+
+    def archive(self, df: pd.DataFrame) -> List[int]:
+        """
+        Appends rows to the segments matching their sent_timestamp month.
+        A row whose id is already archived with the same recipient, subject and
+        sent_timestamp is treated as archived (e.g. a retry after a crash).
+        A row whose id collides with a different archived row is not written.
+
+        Returns:
+            List[int]: The ids of the rows that are now safely in the archive.
+        """
+        if df.empty:
+            return []
+        df = df.copy()
+        df['sent_timestamp'] = pd.to_datetime(df['sent_timestamp'], errors='coerce', format='ISO8601')
+        archived_ids = []
+        written = 0
+        for month, rows in df.groupby(df['sent_timestamp'].dt.strftime('%Y-%m')):
+            path = self._segment_path(month)
+            if os.path.exists(path):
+                existing = self._read_segment(path)
+                matched = rows.merge(existing[['id', 'recipient', 'subject', 'sent_timestamp']],
+                                     on='id', how='left', suffixes=('', '_archived'), indicator=True)
+                is_new = (matched['_merge'] == 'left_only').to_numpy()
+                is_same = ((matched['recipient'] == matched['recipient_archived'])
+                           & (matched['subject'] == matched['subject_archived'])
+                           & (matched['sent_timestamp'] == matched['sent_timestamp_archived'])).to_numpy()
+                conflicts = rows[~is_new & ~is_same]
+                if not conflicts.empty:
+                    logger.error(f"Not archiving email rows {conflicts['id'].tolist()}: "
+                                 f"their ids collide with different rows in {path}.")
+                archived_ids.extend(rows[~is_new & is_same]['id'].tolist())
+                rows = rows[is_new]
+                merged = pd.concat([existing, rows], ignore_index=True)
+            else:
+                merged = rows
+            if not rows.empty:
+                self._write_segment(path, merged.sort_values('sent_timestamp'))
+            archived_ids.extend(rows['id'].tolist())
+            written += len(rows)
+        logger.info(f"Archived {written} email rows into {self.archive_dir}.")
+        return [int(email_id) for email_id in archived_ids]
+
+    def max_id(self) -> int:
+        """Returns the highest archived id, or 0 if the archive is empty."""
+        highest = 0
+        for path in self._list_segments():
+            ids = pd.read_csv(path, compression='gzip', usecols=['id'])['id']
+            if not ids.empty:
+                highest = max(highest, int(ids.max()))
+        return highest
+
+    def query(self, start: datetime, end: datetime) -> pd.DataFrame:
+        """
+        Returns archived rows whose sent_timestamp falls within [start, end).
+        """
+        start_month = start.strftime('%Y-%m')
+        end_month = end.strftime('%Y-%m')
+        frames = []
+        for path in self._list_segments():
+            month = self._segment_month(path)
+            if month < start_month or month > end_month:
+                continue
+            df = self._read_segment(path)
+            mask = (df['sent_timestamp'] >= pd.Timestamp(start)) & (df['sent_timestamp'] < pd.Timestamp(end))
+            frames.append(df[mask])
+        if not frames:
+            return pd.DataFrame(columns=['id', 'recipient', 'subject', 'encrypted_content', 'is_sent', 'sent_timestamp'])
+        return pd.concat(frames, ignore_index=True)
+
+    def purge_content(self, older_than: datetime) -> int:
+        """
+        Shreds the stored ciphertext of archived rows sent before the given time.
+        The row metadata is kept so the archive still answers time-range queries,
+        but the message body can no longer be recovered, even with the key.
+
+        Returns:
+            int: The number of rows whose content was purged.
+        """
+        cutoff = pd.Timestamp(older_than)
+        cutoff_month = older_than.strftime('%Y-%m')
+        purged = 0
+        for path in self._list_segments():
+            if self._segment_month(path) > cutoff_month:
+                continue
+            df = self._read_segment(path)
+            mask = (df['sent_timestamp'] < cutoff) & df['encrypted_content'].notna()
+            if not mask.any():
+                continue
+            df.loc[mask, 'encrypted_content'] = None
+            self._write_segment(path, df)
+            purged += int(mask.sum())
+        logger.info(f"Purged encrypted content of {purged} archived email rows.")
+        return purged
@@ -1,17 +1,28 @@
 # infrastructure/csv_repository.py
 
 import os
+import time
 import pandas as pd
+from contextlib import contextmanager
 from typing import List
 from domain.email_repository import EmailRepository
-from domain.models import EmailMessage
+from domain.models import EmailMessage, PendingEmail
 from infrastructure.logger import logger
 from infrastructure.encryption_service import EncryptionService
+from infrastructure.archive_repository import CSVArchiveRepository
 from datetime import datetime
 
+# How long a writer waits for the queue lock, and the age after which a lock
+# left behind by a crashed process is considered stale and removed.
+LOCK_TIMEOUT_SECONDS = 30
+STALE_LOCK_SECONDS = 300
+
 class CSVRepository(EmailRepository):
     def __init__(self, email_file: str, encryption_service: EncryptionService):
         self.email_file = email_file
+        # Highest id ever issued; survives compaction removing rows from the live file.
+        self.sequence_file = f"{email_file}.seq"
+        self.lock_file = f"{email_file}.lock"
         self.encryption_service = encryption_service
         self._check_and_create_files()
 
@@ -20,10 +31,63 @@ class CSVRepository(EmailRepository):
             df = pd.DataFrame(columns=['id', 'recipient', 'subject', 'encrypted_content', 'is_sent', 'sent_timestamp'])
             df.to_csv(self.email_file, index=False)
 
+    @contextmanager
+    def _locked(self):
+        """
+        Serialises read-modify-write cycles on the queue file across processes,
+        so the web app and the jobs never overwrite each other's changes.
+        """
+        deadline = time.monotonic() + LOCK_TIMEOUT_SECONDS
+        while True:
+            try:
+                fd = os.open(self.lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                break
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(self.lock_file) > STALE_LOCK_SECONDS:
+                        logger.warning(f"Removing stale lock {self.lock_file}.")
+                        os.remove(self.lock_file)
+                        continue
+                except FileNotFoundError:
+                    continue
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Timed out waiting for lock {self.lock_file}.")
+                time.sleep(0.05)
+        try:
+            os.close(fd)
+            yield
+        finally:
+            os.remove(self.lock_file)
+
+    def _write_emails(self, df: pd.DataFrame) -> None:
+        # Replace the file atomically so readers never see a partially written queue.
+        tmp_path = f"{self.email_file}.tmp"
+        df.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, self.email_file)
+
+    def _read_sequence(self) -> int:
+        if not os.path.exists(self.sequence_file):
+            return 0
+        with open(self.sequence_file, 'r') as f:
+            value = f.read().strip()
+        return int(value) if value else 0
+
+    def _write_sequence(self, value: int) -> None:
+        tmp_path = f"{self.sequence_file}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(str(int(value)))
+        os.replace(tmp_path, self.sequence_file)
+
     def add_email(self, email: EmailMessage) -> None:
-        df_emails = pd.read_csv(self.email_file)
-        email.id = df_emails['id'].max() + 1 if not df_emails.empty else 1
         encrypted_content = self.encryption_service.encrypt(email.content)
+        with self._locked():
+            self._append_email(email, encrypted_content)
+
+    def _append_email(self, email: EmailMessage, encrypted_content: str) -> None:
+        df_emails = pd.read_csv(self.email_file)
+        live_max = int(df_emails['id'].max()) if not df_emails.empty else 0
+        email.id = max(live_max, self._read_sequence()) + 1
+        self._write_sequence(email.id)
         new_row = {
             'id': email.id,
             'recipient': email.recipient,
@@ -34,7 +98,7 @@ class CSVRepository(EmailRepository):
         }
         new_df = pd.DataFrame([new_row])
         df_emails = pd.concat([df_emails, new_df], ignore_index=True)
-        df_emails.to_csv(self.email_file, index=False)
+        self._write_emails(df_emails)
 
     def get_emails_to_send(self, limit: int) -> List[EmailMessage]:
         emails = []
@@ -54,8 +118,52 @@ class CSVRepository(EmailRepository):
             emails.append(email)
         return emails
 
+    def get_pending_emails(self) -> List[PendingEmail]:
+        df = pd.read_csv(self.email_file, usecols=['id', 'recipient', 'subject', 'encrypted_content', 'is_sent'])
+        df_pending = df[(df['is_sent'] == False)]
+        return [
+            PendingEmail(id=int(email_id), recipient=recipient, subject=subject, encrypted_content=encrypted_content)
+            for email_id, recipient, subject, encrypted_content in zip(
+                df_pending['id'], df_pending['recipient'], df_pending['subject'], df_pending['encrypted_content'])
+        ]
+
+    def decrypt_content(self, encrypted_content: str) -> str:
+        return self.encryption_service.decrypt(encrypted_content)
+
     def update_email_status(self, email_id: int, is_sent: bool) -> None:
-        df = pd.read_csv(self.email_file)
-        df.loc[df['id'] == email_id, 'is_sent'] = is_sent
-        df.loc[df['id'] == email_id, 'sent_timestamp'] = pd.Timestamp.now()
-        df.to_csv(self.email_file, index=False)
\ No newline at end of file
+        with self._locked():
+            df = pd.read_csv(self.email_file)
+            df.loc[df['id'] == email_id, 'is_sent'] = is_sent
+            df.loc[df['id'] == email_id, 'sent_timestamp'] = pd.Timestamp.now()
+            self._write_emails(df)
+
+    def compact(self, older_than: datetime, archive_repository: CSVArchiveRepository) -> int:
+        """
+        Moves sent emails whose sent_timestamp is older than the given time into
+        the archive, leaving only actionable rows in the live queue file.
+        Rows the archive refuses stay in the live queue.
+
+        Returns:
+            int: The number of rows archived and removed from the live queue.
+        """
+        with self._locked():
+            df = pd.read_csv(self.email_file)
+            # Record the highest id before rows leave the live file, so ids are never reissued.
+            # The archive is only scanned to seed a missing sequence file.
+            if os.path.exists(self.sequence_file):
+                highest = self._read_sequence()
+            else:
+                highest = archive_repository.max_id()
+            live_max = int(df['id'].max()) if not df.empty else 0
+            if live_max > highest or not os.path.exists(self.sequence_file):
+                self._write_sequence(max(highest, live_max))
+            sent_at = pd.to_datetime(df['sent_timestamp'], errors='coerce', format='ISO8601')
+            is_sent = df['is_sent'].astype(str).str.lower() == 'true'
+            mask = is_sent & (sent_at < pd.Timestamp(older_than))
+            if not mask.any():
+                return 0
+            # Archive before rewriting the live file so a failure never loses rows.
+            archived_ids = archive_repository.archive(df[mask])
+            removed = mask & df['id'].isin(archived_ids)
+            self._write_emails(df[~removed])
+            return int(removed.sum())
@@ -1,16 +1,106 @@
 # infrastructure/email_sender.py
 
 import time
+import base64
 import smtplib
 import os
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+from email.header import Header
+from typing import List, Optional, Tuple
 from infrastructure.logger import logger
 
+# SMTP limits a line to 998 characters, excluding the trailing CRLF.
+MAX_LINE_LENGTH = 998
+# Headers longer than this are folded, as recommended by RFC 5322.
+FOLD_LINE_LENGTH = 78
+
+class MessageBuilder:
+    """
+    Builds single-part plain text messages directly as bytes.
+    The constant headers are rendered once, so each message only costs
+    encoding its own To, Subject and body instead of a full run of the
+    email package generator.
+    """
+    def __init__(self, sender_email: str):
+        self.sender_email = sender_email
+        self._from_header = f"From: {self._clean(sender_email)}\r\n".encode('utf-8')
+        self._mime_header = b"MIME-Version: 1.0\r\nContent-Type: text/plain; charset=\"utf-8\"\r\n"
+
+    @staticmethod
+    def _clean(value: str) -> str:
+        # Header values must stay on one line, otherwise they could inject extra headers.
+        return value.replace('\r', ' ').replace('\n', ' ')
+
+    @staticmethod
+    def _encode_header(value: str, smtputf8: bool) -> bytes:
+        if value.isascii() or smtputf8:
+            return value.encode('utf-8')
+        return Header(value, 'utf-8').encode().encode('ascii')
+
+    @staticmethod
+    def _encode_folded_header(name: str, value: str, smtputf8: bool) -> bytes:
+        """Encodes a free-text header value, folding it when the line would be too long."""
+        if len(name) + 2 + len(value) <= FOLD_LINE_LENGTH and (value.isascii() or smtputf8):
+            return value.encode('utf-8')
+        if value.isascii():
+            # Fold at whitespace, keeping the text readable.
+            folded = Header(value, 'us-ascii', header_name=name).encode(linesep='\r\n', maxlinelen=FOLD_LINE_LENGTH)
+            if all(len(line) <= MAX_LINE_LENGTH for line in folded.split('\r\n')):
+                return folded.encode('ascii')
+        # Encoded words can be split anywhere, so this always fits the line limit.
+        return Header(value, 'utf-8', header_name=name).encode(linesep='\r\n', maxlinelen=FOLD_LINE_LENGTH).encode('ascii')
+
+    @staticmethod
+    def _fits_line_limit(body: bytes) -> bool:
+        return all(len(line) <= MAX_LINE_LENGTH for line in body.split(b'\r\n'))
+
+    def build(self, recipient: str, subject: str, content: str,
+              eightbitmime: bool = False, smtputf8: bool = False) -> Tuple[bytes, List[str]]:
+        """
+        Renders a message ready to hand to smtplib.
+
+        Args:
+            recipient (str): The recipient's email address.
+            subject (str): The email subject.
+            content (str): The email body.
+            eightbitmime (bool): Whether the server accepts 8-bit bodies.
+            smtputf8 (bool): Whether the server accepts UTF-8 headers and addresses.
+
+        Returns:
+            Tuple[bytes, List[str]]: The message bytes and the SMTP MAIL options it needs.
+        """
+        recipient = self._clean(recipient)
+        subject = self._clean(subject)
+        body = content.replace('\r\n', '\n').replace('\r', '\n').replace('\n', '\r\n').encode('utf-8')
+        mail_options = []
+        use_smtputf8 = smtputf8 and not (recipient.isascii() and subject.isascii() and self.sender_email.isascii())
+
+        if body.isascii() and self._fits_line_limit(body):
+            transfer_encoding = b"7bit"
+        elif eightbitmime and self._fits_line_limit(body):
+            # The server takes the UTF-8 body as-is, no re-encoding needed.
+            transfer_encoding = b"8bit"
+            mail_options.append('BODY=8BITMIME')
+        else:
+            transfer_encoding = b"base64"
+            body = base64.encodebytes(body).replace(b'\n', b'\r\n')
+        if use_smtputf8:
+            mail_options.append('SMTPUTF8')
+
+        message = b"".join([
+            self._from_header,
+            b"To: ", self._encode_header(recipient, use_smtputf8), b"\r\n",
+            b"Subject: ", self._encode_folded_header('Subject', subject, use_smtputf8), b"\r\n",
+            self._mime_header,
+            b"Content-Transfer-Encoding: ", transfer_encoding, b"\r\n",
+            b"\r\n",
+            body,
+        ])
+        return message, mail_options
+
 class EmailSender:
     """
     A service to handle the actual sending of emails.
-    This is a mock implementation for demonstration.
+    The SMTP connection is opened on first use and reused for later messages.
     """
     def __init__(self):
         # SMTP configuration - use environment variables for security
@@ -18,42 +108,59 @@ class EmailSender:
         self.smtp_port = 587
         self.sender_email = os.getenv('SENDER_EMAIL', 'your-email@gmail.com')
         self.sender_password = os.getenv('SENDER_PASSWORD', 'your-app-password')
+        self.message_builder = MessageBuilder(self.sender_email)
+        self._server: Optional[smtplib.SMTP] = None
         logger.info("Email sender service initialized.")
 
+    def _connect(self) -> smtplib.SMTP:
+        """Returns the pooled SMTP session, opening and authenticating it if needed."""
+        if self._server is None:
+            server = smtplib.SMTP(self.smtp_server, self.smtp_port)
+            server.starttls()  # Enable TLS encryption
+            server.login(self.sender_email, self.sender_password)
+            self._server = server
+        return self._server
+
+    def _send(self, recipient: str, subject: str, content: str) -> None:
+        server = self._connect()
+        message, mail_options = self.message_builder.build(
+            recipient, subject, content,
+            eightbitmime=server.has_extn('8bitmime'),
+            smtputf8=server.has_extn('smtputf8')
+        )
+        server.sendmail(self.sender_email, recipient, message, mail_options=mail_options)
+
+    def close(self) -> None:
+        """Closes the pooled SMTP session, if one is open."""
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except smtplib.SMTPException:
+                self._server.close()
+            self._server = None
+
     def send_email(self, recipient: str, subject: str, content: str) -> bool:
         """
         Sends an actual email using SMTP.
-        
+
         Args:
             recipient (str): The recipient's email address.
             subject (str): The email subject.
             content (str): The email body.
-            
+
         Returns:
             bool: True if the email was sent successfully, False otherwise.
         """
         try:
             logger.info(f"Attempting to send email to {recipient}...")
-            
-            # Create message
-            msg = MIMEMultipart()
-            msg['From'] = self.sender_email
-            msg['To'] = recipient
-            msg['Subject'] = subject
-            
-            # Add body to email
-            msg.attach(MIMEText(content, 'plain'))
-            
-            # Create SMTP session
-            server = smtplib.SMTP(self.smtp_server, self.smtp_port)
-            server.starttls()  # Enable TLS encryption
-            server.login(self.sender_email, self.sender_password)
-            
-            # Send email
-            text = msg.as_string()
-            server.sendmail(self.sender_email, recipient, text)
-            server.quit()
-            
+
+            try:
+                self._send(recipient, subject, content)
+            except smtplib.SMTPServerDisconnected:
+                # The pooled session timed out; reconnect once and retry
+                self._server = None
+                self._send(recipient, subject, content)
+
             logger.info(f"Email sent successfully to {recipient}.")
             logger.debug(f"Subject: {subject}")
             logger.debug(f"Content: {content[:50]}...") # Show a snippet of content
@@ -0,0 +1,118 @@
+# infrastructure/idempotency_index.py
+
+import hmac
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+class IdempotencyConflictError(Exception):
+    """Raised when a client idempotency key is reused for a different message."""
+    pass
+
+class IdempotencyIndex:
+    """
+    A bounded, expiring in-memory index of recently queued emails.
+    Entries are keyed by an HMAC digest, so neither the client's idempotency
+    key nor the message itself is ever held in plaintext.
+    """
+    def __init__(self, secret: bytes, ttl_seconds: int = 600, max_entries: int = 10000):
+        self.secret = secret
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        # Keys whose first request is still being processed, with its payload
+        # fingerprint and an event set when it finishes.
+        self._in_flight: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def make_key(self, recipient: str, subject: str, content: str, client_key: Optional[str] = None) -> str:
+        """
+        Derives the lookup key for a request. A client-supplied idempotency key
+        takes precedence; otherwise the key covers recipient, subject and content.
+        """
+        if client_key:
+            material = f"client\x00{client_key}"
+        else:
+            material = f"message\x00{recipient.strip().lower()}\x00{subject}\x00{content}"
+        return self._digest(material)
+
+    def make_fingerprint(self, recipient: str, subject: str, content: str) -> str:
+        """Derives an HMAC of the message itself, stored alongside each key."""
+        return self._digest(f"payload\x00{recipient.strip().lower()}\x00{subject}\x00{content}")
+
+    def _digest(self, material: str) -> str:
+        return hmac.new(self.secret, material.encode('utf-8'), hashlib.sha256).hexdigest()
+
+    @staticmethod
+    def _check_fingerprint(stored: str, fingerprint: str) -> None:
+        if not hmac.compare_digest(stored, fingerprint):
+            raise IdempotencyConflictError("Idempotency key was already used for a different message.")
+
+    def _lookup(self, key: str) -> Optional[tuple]:
+        # Must be called with the lock held.
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[2] <= time.monotonic():
+            del self._entries[key]
+            return None
+        return entry
+
+    def claim(self, key: str, fingerprint: str, timeout: float = 60) -> Optional[int]:
+        """
+        Returns the message ID already recorded for the key, or None once the
+        caller holds the reservation for it. While another request holds the
+        reservation, waits for it to finish and then returns its result.
+        The caller must finish a reservation with put() or release().
+
+        Raises:
+            IdempotencyConflictError: If the key belongs to a different message.
+            TimeoutError: If the request holding the reservation does not finish in time.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                entry = self._lookup(key)
+                if entry is not None:
+                    message_id, stored_fingerprint, _ = entry
+                    self._check_fingerprint(stored_fingerprint, fingerprint)
+                    return message_id
+                reservation = self._in_flight.get(key)
+                if reservation is None:
+                    self._in_flight[key] = (fingerprint, threading.Event())
+                    return None
+                stored_fingerprint, in_flight = reservation
+                self._check_fingerprint(stored_fingerprint, fingerprint)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not in_flight.wait(remaining):
+                raise TimeoutError("Timed out waiting for a duplicate request to finish.")
+
+    def release(self, key: str) -> None:
+        """Drops a reservation without a result, letting a waiting duplicate retry."""
+        with self._lock:
+            reservation = self._in_flight.pop(key, None)
+        if reservation is not None:
+            reservation[1].set()
+
+    def put(self, key: str, message_id: int) -> None:
+        """
+        Records the message ID for the key, finishing its reservation and
+        evicting expired and oldest entries.
+        """
+        with self._lock:
+            now = time.monotonic()
+            reservation = self._in_flight.pop(key, None)
+            if reservation is None:
+                # Only a request holding the reservation may record a result.
+                return
+            self._entries[key] = (message_id, reservation[0], now + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            # Entries are kept in insertion order, so expired ones sit at the front.
+            while self._entries:
+                oldest_key, (_, _, expires_at) = next(iter(self._entries.items()))
+                if expires_at > now and len(self._entries) <= self.max_entries:
+                    break
+                del self._entries[oldest_key]
+        reservation[1].set()
@@ -0,0 +1,75 @@
+# jobs/compaction_job.py
+
+import sys
+import os
+import time
+import argparse
+import pandas as pd
+from datetime import datetime, timedelta
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from infrastructure.csv_repository import CSVRepository
+from infrastructure.archive_repository import CSVArchiveRepository
+from infrastructure.encryption_service import EncryptionService
+from infrastructure.logger import logger
+
+EMAIL_FILE = 'data/emails_to_send.csv'
+ARCHIVE_DIR = 'data/archive'
+
+def time_live_queue_scan(email_file: str, repeat: int = 5) -> float:
+    """
+    Times the scan every read path performs on the live queue
+    (load the file and filter unsent rows), returning the best run in ms.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        df = pd.read_csv(email_file)
+        df[(df['is_sent'] == False)]
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def run_compaction_job(retention_days: int = 7, purge_after_days: int = None, benchmark: bool = False):
+    """
+    Moves sent emails older than the retention window into compressed monthly
+    archive segments and optionally shreds the content of old archived rows.
+    """
+    try:
+        logger.info("Starting the queue compaction job...")
+
+        encryption_service = EncryptionService()
+        email_repository = CSVRepository(email_file=EMAIL_FILE, encryption_service=encryption_service)
+        archive_repository = CSVArchiveRepository(archive_dir=ARCHIVE_DIR)
+
+        if benchmark:
+            before_ms = time_live_queue_scan(EMAIL_FILE)
+
+        cutoff = datetime.now() - timedelta(days=retention_days)
+        compacted = email_repository.compact(older_than=cutoff, archive_repository=archive_repository)
+        logger.info(f"Moved {compacted} sent emails older than {retention_days} days to the archive.")
+
+        if benchmark:
+            after_ms = time_live_queue_scan(EMAIL_FILE)
+            logger.info(f"Live queue scan time: {before_ms:.2f} ms before compaction, {after_ms:.2f} ms after.")
+
+        if purge_after_days is not None:
+            purge_cutoff = datetime.now() - timedelta(days=purge_after_days)
+            archive_repository.purge_content(older_than=purge_cutoff)
+
+        logger.info("Queue compaction job completed.")
+
+    except Exception as e:
+        logger.critical(f"A critical error occurred in the queue compaction job: {e}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compact the live email queue into the archive.")
+    parser.add_argument('--retention-days', type=int, default=7,
+                        help="Keep sent emails in the live queue for this many days.")
+    parser.add_argument('--purge-after-days', type=int, default=None,
+                        help="Shred the content of archived emails older than this many days.")
+    parser.add_argument('--benchmark', action='store_true',
+                        help="Log live queue scan time before and after compaction.")
+    args = parser.parse_args()
+    run_compaction_job(args.retention_days, args.purge_after_days, args.benchmark)
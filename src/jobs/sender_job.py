@@ -2,16 +2,47 @@
 
 import sys
 import os
+import time
+import json
 from datetime import datetime
 
 # Add the project root to the Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+from application.domain_scheduler import DomainScheduler
 from infrastructure.csv_repository import CSVRepository
 from infrastructure.email_sender import EmailSender
 from infrastructure.encryption_service import EncryptionService
 from infrastructure.logger import setup_logger, logger
 
+# Maximum number of emails sent per job run.
+BATCH_SIZE = 10
+# Per-domain token bucket: sustained sends per second and maximum burst.
+DOMAIN_RATE_PER_SECOND = float(os.getenv('DOMAIN_RATE_PER_SECOND', '1'))
+DOMAIN_BURST = int(os.getenv('DOMAIN_BURST', '5'))
+# Token bucket state saved between runs so the per-domain rate holds across them.
+BUCKET_STATE_FILE = 'data/domain_buckets.json'
+# Longest the job will wait for a throttled domain before ending the run.
+MAX_THROTTLE_WAIT_SECONDS = 5
+
+def load_bucket_state(path: str) -> dict:
+    """Loads the saved per-domain token bucket state, or an empty state."""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not load domain rate limit state, starting fresh: {e}")
+        return {}
+
+def save_bucket_state(path: str, state: dict) -> None:
+    """Saves the per-domain token bucket state atomically."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
 def run_email_job():
     """
     The main function for the email sender job.
@@ -29,21 +60,38 @@ def run_email_job():
         email_repository = CSVRepository(email_file='data/emails_to_send.csv', encryption_service=encryption_service)
         email_sender = EmailSender()
 
-        # Get the next batch of emails to send (e.g., up to 10 records)
-        emails_to_send = email_repository.get_emails_to_send(limit=10)
+        # Load every pending email in one read; content is decrypted only when sent
+        pending_emails = {email.id: email for email in email_repository.get_pending_emails()}
 
-        if not emails_to_send:
+        if not pending_emails:
             logger.info("No emails to send. Job finished.")
             return
 
-        # Process each email in the batch
-        for email in emails_to_send:
+        scheduler = DomainScheduler([(email.id, email.recipient) for email in pending_emails.values()],
+                                    rate_per_second=DOMAIN_RATE_PER_SECOND, burst=DOMAIN_BURST,
+                                    bucket_state=load_bucket_state(BUCKET_STATE_FILE))
+
+        # Process up to BATCH_SIZE emails, interleaving domains round-robin
+        sent_count = 0
+        while sent_count < BATCH_SIZE and scheduler.pending():
+            email_id = scheduler.next_email_id()
+            if email_id is None:
+                wait = scheduler.time_until_next()
+                if wait > MAX_THROTTLE_WAIT_SECONDS:
+                    logger.info("All pending domains are rate limited. Remaining emails stay in the queue.")
+                    break
+                time.sleep(wait)
+                continue
+
+            sent_count += 1
             try:
+                email = pending_emails.pop(email_id)
+
                 # Send the email
                 is_sent = email_sender.send_email(
                     recipient=email.recipient,
                     subject=email.subject,
-                    content=email.content
+                    content=email_repository.decrypt_content(email.encrypted_content)
                 )
 
                 if is_sent:
@@ -53,7 +101,11 @@ def run_email_job():
                     logger.error(f"Failed to send email with ID {email.id}. It will remain in the queue.")
 
             except Exception as e:
-                logger.error(f"An unexpected error occurred while processing email with ID {email.id}: {e}")
+                logger.error(f"An unexpected error occurred while processing email with ID {email_id}: {e}")
+
+        # Release the pooled SMTP connection and keep the rate limits for the next run
+        email_sender.close()
+        save_bucket_state(BUCKET_STATE_FILE, scheduler.bucket_state())
 
         logger.info("Email sender job completed.")
 
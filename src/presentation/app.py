@@ -12,10 +12,11 @@ load_dotenv()
 # Add the project root to the Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from application.email_service import EmailService
+from application.email_service import EmailService, AbusiveContentError
 from infrastructure.csv_repository import CSVRepository
 from infrastructure.ai_service import AIService
 from infrastructure.encryption_service import EncryptionService
+from infrastructure.idempotency_index import IdempotencyIndex, IdempotencyConflictError
 from infrastructure.logger import setup_logger, logger
 
 app = Flask(__name__)
@@ -27,9 +28,14 @@ csv_repository = CSVRepository(
     email_file='data/emails_to_send.csv',
     encryption_service=encryption_service
 )
+idempotency_index = IdempotencyIndex(
+    secret=(os.getenv('IDEMPOTENCY_SECRET') or os.getenv('SECRET_KEY') or '').encode() or os.urandom(32),
+    ttl_seconds=int(os.getenv('IDEMPOTENCY_TTL_SECONDS', '600'))
+)
 email_service = EmailService(
     email_repository=csv_repository,
-    ai_service=ai_service
+    ai_service=ai_service,
+    idempotency_index=idempotency_index
 )
 
 # Initialize pygame for sound
@@ -101,23 +107,30 @@ def send_email():
         recipient = data.get('recipient', '').strip()
         subject = data.get('subject', '').strip()
         content = data.get('content', '').strip()
+        idempotency_key = request.headers.get('Idempotency-Key') or data.get('idempotency_key')
         
         if not recipient or not subject or not content:
             return jsonify({'success': False, 'message': 'Please fill in all fields.'})
         
-        # Check for inappropriate content FIRST
-        if ai_service.check_for_abuse(content):
+        # Moderation happens inside the service, after a retried or double-submitted
+        # request has been matched to the original one
+        try:
+            message_id = email_service.queue_email_for_sending(recipient, subject, content, idempotency_key)
+        except AbusiveContentError:
             return jsonify({
                 'success': False, 
                 'message': 'Your message contains inappropriate, abusive, or sexual content. Please modify your message to be respectful and appropriate.'
             })
+        except IdempotencyConflictError:
+            return jsonify({
+                'success': False,
+                'message': 'This idempotency key was already used for a different message.'
+            }), 409
         
-        is_queued = email_service.queue_email_for_sending(recipient, subject, content)
-        
-        if is_queued:
-            return jsonify({'success': True, 'message': 'Email queued successfully!'})
+        if message_id is not None:
+            return jsonify({'success': True, 'message': 'Email queued successfully!', 'message_id': message_id})
         else:
-            return jsonify({'success': False, 'message': 'Failed to queue email. May contain inappropriate content.'})
+            return jsonify({'success': False, 'message': 'Failed to queue email. Please try again.'})
     except Exception as e:
         logger.error(f"Email sending error: {e}")
         return jsonify({'success': False, 'message': 'An error occurred while queuing the email.'})